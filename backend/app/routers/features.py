@@ -1,4 +1,5 @@
-from fastapi import APIRouter, Depends, HTTPException
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Response
 from app.schemas.features import FeatureSuggestionResponse, FeatureNodeResponse, NodeUpdateRequest
 from app.db import get_supabase
 from app.dependencies import get_openai_key
@@ -16,11 +17,17 @@ def _get_repo_id_for_node(db, node: dict) -> str | None:
     return run_result.data[0]["repo_id"] if run_result.data else None
 
 
+def _json_rows(rows: list[dict]) -> Response:
+    """Serialize DB rows straight to JSON, skipping response_model re-validation."""
+    return Response(content=orjson.dumps(rows), media_type="application/json")
+
+
 @router.patch("/{node_id}", response_model=FeatureNodeResponse)
 async def update_node(node_id: str, body: NodeUpdateRequest):
     """Update a feature node's name and/or description."""
     from app.services.graph_version_service import save_snapshot
     from app.services.graph_cache import invalidate_graph_cache
+    from app.services.suggestion_service import invalidate_suggestion_cache
 
     db = get_supabase()
 
@@ -47,6 +54,7 @@ async def update_node(node_id: str, body: NodeUpdateRequest):
 
     # Delete stale suggestions so they regenerate on next click
     db.table("feature_suggestions").delete().eq("feature_node_id", node_id).execute()
+    invalidate_suggestion_cache([node_id])
 
     # Invalidate graph cache
     if repo_id:
@@ -63,6 +71,7 @@ async def get_suggestions(
     """Generate or retrieve feature expansion suggestions for a node.
     Returns cached suggestions if present; otherwise calls LLM (with criteria if set).
     Criteria are cleared on save, so cache is invalidated only when user saves new criteria.
+    Rows are returned as-is (response_model documents the shape only).
     """
     db = get_supabase()
 
@@ -74,22 +83,13 @@ async def get_suggestions(
         .execute()
     )
     if existing.data:
-        return existing.data
-
-    # No cache: get repo_id and generate via LLM (with criteria if set)
-    node_result = db.table("feature_nodes").select("analysis_run_id").eq("id", node_id).execute()
-    if not node_result.data:
-        raise HTTPException(status_code=404, detail="Node not found")
-
-    run_result = (
-        db.table("analysis_runs")
-        .select("repo_id")
-        .eq("id", node_result.data[0]["analysis_run_id"])
-        .execute()
-    )
-    repo_id = run_result.data[0]["repo_id"] if run_result.data else None
+        return _json_rows(existing.data)
 
-    from app.services.suggestion_service import generate_suggestions
+    # No cache: generate via LLM; the service resolves the node, its run and repo_id
+    from app.services.suggestion_service import SuggestionContextNotFound, generate_suggestions
 
-    suggestions = await generate_suggestions(node_id, repo_id=repo_id, api_key=openai_key)
-    return suggestions
+    try:
+        suggestions = await generate_suggestions(node_id, api_key=openai_key)
+    except SuggestionContextNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return _json_rows(suggestions)
@@ -76,7 +76,7 @@ async def save_suggestion_criteria(repo_id: str, body: dict):
     """Save suggestion criteria and clear all existing suggestions for the repo.
     Body: { criteria: { criterion1: "...", criterion2: "...", ... } }
     """
-    from app.services.suggestion_service import set_criteria_for_repo
+    from app.services.suggestion_service import invalidate_suggestion_cache, set_criteria_for_repo
 
     db = get_supabase()
     result = db.table("repos").select("id").eq("id", repo_id).execute()
@@ -100,6 +100,7 @@ async def save_suggestion_criteria(repo_id: str, body: dict):
     node_ids = [n["id"] for n in (nodes_result.data or [])]
     if node_ids:
         db.table("feature_suggestions").delete().in_("feature_node_id", node_ids).execute()
+        invalidate_suggestion_cache(node_ids)
 
     return {"status": "ok", "message": "Criteria saved and suggestions cleared"}
 
@@ -704,14 +704,14 @@ async def _run_verification(
             return False, (stdout + stderr).strip()
         return True, ""
 
-    # JavaScript / TypeScript — npm scripts
+    # JavaScript / TypeScript — npm scripts. The checks are independent,
+    # so run them concurrently: wall time is the slowest check, not the sum.
+    checks = [c for c in ("test", "lint", "typecheck") if c in scripts]
+    results = await asyncio.gather(
+        *(_run_command(f"npm run {check}", cwd=sandbox_path) for check in checks)
+    )
     errors: list[str] = []
-    for check in ["test", "lint", "typecheck"]:
-        if check not in scripts:
-            continue
-        exit_code, stdout, stderr = await _run_command(
-            f"npm run {check}", cwd=sandbox_path
-        )
+    for check, (exit_code, stdout, stderr) in zip(checks, results):
         if exit_code != 0:
             errors.append(f"`npm run {check}` failed:\n{stderr[:1000]}")
             logger.warning(f"Verification '{check}' failed: {stderr[:500]}")
@@ -883,6 +883,7 @@ async def execute_plan_phase(execution_run_id: str) -> None:
       4. Save plan to DB, set status to awaiting_approval
     """
     db = get_supabase()
+    sandbox_path: str | None = None
 
     try:
         # ---- Fetch context ----
@@ -903,11 +904,13 @@ async def execute_plan_phase(execution_run_id: str) -> None:
         sandbox_path = await _clone_to_sandbox(
             github_url, repo_name, execution_run_id
         )
-        _update_status(execution_run_id, "cloning", sandbox_path=sandbox_path)
 
-        # Create feature branch
+        # Create feature branch; persist sandbox + branch in a single update
         create_branch(sandbox_path, branch_name)
-        _update_status(execution_run_id, "cloning", branch_name=branch_name)
+        _update_status(
+            execution_run_id, "cloning",
+            sandbox_path=sandbox_path, branch_name=branch_name,
+        )
         _log(execution_run_id, "clone", f"Created branch {branch_name}")
 
         # Walk the live sandbox — ground truth for language/framework detection
@@ -962,7 +965,9 @@ async def execute_plan_phase(execution_run_id: str) -> None:
 
     except Exception as e:
         logger.exception(f"Plan phase failed for {execution_run_id}: {e}")
-        _update_status(execution_run_id, "failed")
+        # Keep the sandbox path so abandon/cleanup can still find the clone
+        extra = {"sandbox_path": sandbox_path} if sandbox_path else {}
+        _update_status(execution_run_id, "failed", **extra)
         _log(execution_run_id, "error", str(e), level="error")
 
 
@@ -3,7 +3,6 @@
 import os
 import shutil
 import tempfile
-from pathlib import Path
 
 from git import Repo
 from github import Github
@@ -29,8 +28,17 @@ def clone_repo(github_url: str, target_dir: str | None = None) -> str:
     return target_dir
 
 
+# Read size for count_loc; bounds memory on very large files
+_LOC_CHUNK_SIZE = 1 << 20
+
+
 def count_loc(repo_path: str) -> int:
-    """Count lines of code in a repository (non-binary, non-vendor files)."""
+    """Count lines of code in a repository (non-binary, non-vendor files).
+
+    Walks the tree with os.scandir and counts newlines on raw bytes read in
+    fixed-size chunks, so no text decoding happens and large files are never
+    held in memory whole. A trailing line without a newline still counts.
+    """
     skip_dirs = {
         "node_modules", ".git", "dist", "build", ".next", "vendor",
         "__pycache__", ".venv", "venv",
@@ -40,16 +48,27 @@ def count_loc(repo_path: str) -> int:
         ".scss", ".html", ".md", ".yaml", ".yml", ".toml",
     }
     total = 0
-    for root, dirs, files in os.walk(repo_path):
-        dirs[:] = [d for d in dirs if d not in skip_dirs]
-        for f in files:
-            ext = Path(f).suffix.lower()
-            if ext in code_extensions:
+    stack = [repo_path]
+    while stack:
+        try:
+            entries = os.scandir(stack.pop())
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
                 try:
-                    filepath = os.path.join(root, f)
-                    with open(filepath, "r", encoding="utf-8", errors="ignore") as fh:
-                        total += sum(1 for _ in fh)
-                except (OSError, UnicodeDecodeError):
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in skip_dirs:
+                            stack.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in code_extensions and entry.is_file():
+                        last = b"\n"
+                        with open(entry.path, "rb") as fh:
+                            for chunk in iter(lambda: fh.read(_LOC_CHUNK_SIZE), b""):
+                                total += chunk.count(b"\n")
+                                last = chunk[-1:]
+                        if last != b"\n":
+                            total += 1
+                except OSError:
                     continue
     return total
 
@@ -1,11 +1,12 @@
 import asyncio
-import json
+import functools
 import logging
 
 import httpx
 import openai
+import orjson
 from openai import AsyncOpenAI
-from pydantic import BaseModel, ValidationError
+from pydantic import BaseModel, TypeAdapter, ValidationError
 from app.config import settings
 
 logger = logging.getLogger(__name__)
@@ -28,6 +29,12 @@ def _make_client(api_key: str | None = None) -> AsyncOpenAI:
     return AsyncOpenAI(api_key=key, http_client=httpx.AsyncClient())
 
 
+@functools.lru_cache(maxsize=128)
+def list_adapter(item_model: type[BaseModel]) -> TypeAdapter:
+    """Return a cached TypeAdapter for list[item_model] (schema is built once per model)."""
+    return TypeAdapter(list[item_model])
+
+
 def _is_transient(exc: Exception) -> bool:
     """Return True for errors that are safe to retry (rate limits, network, 5xx)."""
     return isinstance(exc, (
@@ -75,9 +82,8 @@ async def call_llm_structured(
 
         raw = response.choices[0].message.content
         try:
-            parsed = json.loads(raw)
-            return response_model.model_validate(parsed)
-        except (json.JSONDecodeError, ValidationError) as e:
+            return response_model.model_validate_json(raw)
+        except ValidationError as e:
             if attempt == max_retries:
                 raise ValueError(
                     f"LLM returned invalid output after {max_retries + 1} attempts: {e}"
@@ -97,7 +103,7 @@ async def call_llm_structured_list(
 ) -> list:
     """Call OpenAI expecting a JSON object with a list under `list_key`.
 
-    Each item is validated against item_model.
+    The list is validated against list[item_model] in a single pass.
     Retries on transient API errors with backoff, and on malformed output.
     """
     client = _make_client(api_key)
@@ -124,12 +130,10 @@ async def call_llm_structured_list(
 
         raw = response.choices[0].message.content
         try:
-            parsed = json.loads(raw)
+            parsed = orjson.loads(raw)
             items = parsed.get(list_key, parsed)
-            if isinstance(items, list):
-                return [item_model.model_validate(item) for item in items]
-            raise ValueError(f"Expected a list under key '{list_key}'")
-        except (json.JSONDecodeError, ValidationError, ValueError) as e:
+            return list_adapter(item_model).validate_python(items)
+        except (orjson.JSONDecodeError, ValidationError, ValueError) as e:
             if attempt == max_retries:
                 raise ValueError(
                     f"LLM returned invalid list output after {max_retries + 1} attempts: {e}"
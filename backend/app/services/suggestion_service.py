@@ -1,11 +1,18 @@
 """Feature expansion suggestions for a given node."""
 
-import json
+import hashlib
+import time
+from collections import OrderedDict
 
+import orjson
 from pydantic import BaseModel
 
 from app.db import get_supabase
-from app.services.llm_service import call_llm_structured_list
+from app.services.llm_service import call_llm_structured_list, list_adapter
+
+
+class SuggestionContextNotFound(ValueError):
+    """The feature node, or the analysis run it belongs to, does not exist."""
 
 
 # ---------------------------------------------------------------------------
@@ -26,6 +33,24 @@ class SuggestionItem(BaseModel):
 # LLM call
 # ---------------------------------------------------------------------------
 
+# Identical on every call so it forms a cacheable prompt prefix
+_SUGGESTION_SYSTEM_PROMPT = (
+    "You are a senior software architect suggesting feature expansions "
+    "for an existing codebase. Given a specific feature node and the "
+    "repo context, suggest 3 to 8 related feature expansions.\n\n"
+    "Return a JSON object with key 'suggestions' containing a list. "
+    "Each suggestion must have:\n"
+    "- name (string): concise feature name\n"
+    "- rationale (string): 1-2 sentences on why this fits\n"
+    "- complexity (string): one of 'low', 'medium', 'high'\n"
+    "- impacted_files (list[string]): approximate file paths affected\n"
+    "- test_cases (list[string]): suggested test descriptions\n"
+    "- implementation_sketch (string): brief implementation approach\n\n"
+    "Suggestions should be practical, actionable, and relevant to the "
+    "existing feature. Vary the complexity across suggestions. If the user "
+    "message lists ADDITIONAL CRITERIA, every suggestion MUST satisfy them."
+)
+
 
 async def _call_llm_for_suggestions(
     node: dict,
@@ -33,50 +58,40 @@ async def _call_llm_for_suggestions(
     criteria: dict | None = None,
     api_key: str | None = None,
 ) -> list[dict]:
-    """Call the LLM to generate 3-8 feature expansion suggestions."""
+    """Call the LLM to generate 3-8 feature expansion suggestions.
+
+    The prompt is ordered stable-first (fixed system prompt, then repo
+    context, then node and criteria) so OpenAI's automatic prompt caching
+    can reuse the shared prefix across nodes of the same repo.
+    """
     criteria_text = ""
     if criteria and any((v or "").strip() for v in criteria.values()):
         parts = [f"- {k}: {v}" for k, v in criteria.items() if (v or "").strip()]
         criteria_text = (
-            "\n\nADDITIONAL CRITERIA (all suggestions MUST satisfy these):\n"
+            "\nADDITIONAL CRITERIA (all suggestions MUST satisfy these):\n"
             + "\n".join(parts)
+            + "\n"
         )
 
-    system_prompt = (
-        "You are a senior software architect suggesting feature expansions "
-        "for an existing codebase. Given a specific feature node and the "
-        "repo context, suggest 3 to 8 related feature expansions.\n\n"
-        "Return a JSON object with key 'suggestions' containing a list. "
-        "Each suggestion must have:\n"
-        "- name (string): concise feature name\n"
-        "- rationale (string): 1-2 sentences on why this fits\n"
-        "- complexity (string): one of 'low', 'medium', 'high'\n"
-        "- impacted_files (list[string]): approximate file paths affected\n"
-        "- test_cases (list[string]): suggested test descriptions\n"
-        "- implementation_sketch (string): brief implementation approach\n\n"
-        "Suggestions should be practical, actionable, and relevant to the "
-        "existing feature. Vary the complexity across suggestions."
-        + criteria_text
-    )
-
     user_content = (
-        f"Feature: {node['name']}\n"
-        f"Description: {node['description']}\n"
-        f"Anchor files: {json.dumps(node.get('anchor_files', []))}\n\n"
         f"Repository context:\n"
         f"Framework: {digest.get('framework', 'unknown')}\n"
-        f"Dependencies: {json.dumps(digest.get('dependencies', {}))}\n"
-        f"File tree:\n{chr(10).join(digest.get('file_tree', [])[:100])}\n"
+        f"Dependencies: {orjson.dumps(digest.get('dependencies', {})).decode()}\n"
+        f"File tree:\n{chr(10).join(digest.get('file_tree', [])[:100])}\n\n"
+        f"Feature: {node['name']}\n"
+        f"Description: {node['description']}\n"
+        f"Anchor files: {orjson.dumps(node.get('anchor_files', [])).decode()}\n"
+        + criteria_text
     )
 
     items = await call_llm_structured_list(
-        system_prompt=system_prompt,
+        system_prompt=_SUGGESTION_SYSTEM_PROMPT,
         user_prompt=user_content,
         item_model=SuggestionItem,
         list_key="suggestions",
         api_key=api_key,
     )
-    return [item.model_dump() for item in items]
+    return list_adapter(SuggestionItem).dump_python(items)
 
 
 # In-memory store for suggestion criteria per repo (cleared on server restart)
@@ -93,6 +108,72 @@ def set_criteria_for_repo(repo_id: str, criteria: dict) -> None:
     _criteria_store[repo_id] = {k: v for k, v in criteria.items() if (v or "").strip()}
 
 
+# In-memory LRU cache of LLM responses: context hash -> (node_id, suggestions, expires_at)
+_suggestion_cache: OrderedDict[str, tuple[str, list[dict], float]] = OrderedDict()
+# Default TTL seconds for cached suggestions (30 minutes)
+SUGGESTION_CACHE_TTL_SECONDS = 1800
+# Keys change with every node edit or re-analysis, so bound the entry count
+SUGGESTION_CACHE_MAX_ENTRIES = 256
+
+
+def _normalize_text(text: str | None) -> str:
+    """Casefold and collapse whitespace so trivially different wordings share a key."""
+    return " ".join((text or "").split()).casefold()
+
+
+def _suggestion_cache_key(node: dict, digest: dict, criteria: dict | None) -> str:
+    """Hash the prompt-relevant context; api_key and sampling params are excluded.
+
+    Node name/description are normalized and anchor files sorted, so edits
+    that differ only in case, spacing or file order reuse the cached response.
+    """
+    ctx = {
+        "name": _normalize_text(node.get("name")),
+        "description": _normalize_text(node.get("description")),
+        "anchor_files": sorted(node.get("anchor_files") or []),
+        "digest": digest,
+        "criteria": criteria or {},
+    }
+    return hashlib.sha256(
+        orjson.dumps(ctx, option=orjson.OPT_SORT_KEYS, default=str)
+    ).hexdigest()
+
+
+def _get_cached_suggestions(key: str) -> list[dict] | None:
+    """Return cached LLM suggestions for key if present and not expired."""
+    entry = _suggestion_cache.get(key)
+    if not entry:
+        return None
+    _, suggestions, expires_at = entry
+    if time.monotonic() > expires_at:
+        del _suggestion_cache[key]
+        return None
+    _suggestion_cache.move_to_end(key)
+    return suggestions
+
+
+def _set_cached_suggestions(key: str, node_id: str, suggestions: list[dict]) -> None:
+    """Store LLM suggestions for key, dropping expired and least recently used entries."""
+    now = time.monotonic()
+    for stale in [k for k, (_, _, expires_at) in _suggestion_cache.items() if now > expires_at]:
+        del _suggestion_cache[stale]
+    _suggestion_cache[key] = (node_id, suggestions, now + SUGGESTION_CACHE_TTL_SECONDS)
+    _suggestion_cache.move_to_end(key)
+    while len(_suggestion_cache) > SUGGESTION_CACHE_MAX_ENTRIES:
+        _suggestion_cache.popitem(last=False)
+
+
+def invalidate_suggestion_cache(node_ids: list[str]) -> None:
+    """Drop cached LLM suggestions for the given nodes.
+
+    Call wherever stored suggestions are deleted so they regenerate;
+    otherwise an unchanged (or only re-cased) context would return the old set.
+    """
+    ids = set(node_ids)
+    for key in [k for k, (node_id, _, _) in _suggestion_cache.items() if node_id in ids]:
+        del _suggestion_cache[key]
+
+
 # ---------------------------------------------------------------------------
 # Main entry point
 # ---------------------------------------------------------------------------
@@ -105,52 +186,40 @@ async def generate_suggestions(
 ) -> list[dict]:
     """Generate 3-8 related feature expansions for a node.
 
-    Fetches the node and repo context from Supabase, calls the LLM,
+    Fetches the node and its analysis run from Supabase in a single RPC,
+    calls the LLM (or reuses a cached response for the same context),
     stores the suggestions in the database, and returns them.
     If criteria are set for the repo, they are included in the LLM prompt.
     """
     db = get_supabase()
 
-    # Fetch the feature node
-    node_result = (
-        db.table("feature_nodes")
-        .select("*")
-        .eq("id", node_id)
-        .execute()
-    )
-    if not node_result.data:
-        raise ValueError(f"Feature node {node_id} not found")
+    # Fetch the feature node and its analysis run in one round trip
+    # (see supabase/migrations/011_get_node_with_run.sql)
+    context = db.rpc("get_node_with_run", {"node_id": node_id}).execute().data
+    if not context:
+        raise SuggestionContextNotFound(f"Feature node {node_id} not found")
 
-    node = node_result.data[0]
+    node = context["node"]
+    run = context.get("run")
+    if not run:
+        raise SuggestionContextNotFound(f"Analysis run {node['analysis_run_id']} not found")
 
     # Resolve repo_id if not provided
-    if not repo_id:
-        run_result = (
-            db.table("analysis_runs")
-            .select("repo_id")
-            .eq("id", node["analysis_run_id"])
-            .execute()
-        )
-        repo_id = run_result.data[0]["repo_id"] if run_result.data else None
-
+    repo_id = repo_id or run.get("repo_id")
     criteria = get_criteria_for_repo(repo_id) if repo_id else {}
 
-    # Fetch the analysis run to get the digest
-    run_result = (
-        db.table("analysis_runs")
-        .select("*")
-        .eq("id", node["analysis_run_id"])
-        .execute()
-    )
-    if not run_result.data:
-        raise ValueError(f"Analysis run {node['analysis_run_id']} not found")
+    digest = run.get("digest_json", {}) or {}
 
-    digest = run_result.data[0].get("digest_json", {}) or {}
-
-    # Call LLM for suggestions (with criteria if set)
-    raw_suggestions = await _call_llm_for_suggestions(
-        node=node, digest=digest, criteria=criteria or None, api_key=api_key
-    )
+    # Call LLM for suggestions (with criteria if set), reusing a cached
+    # response for an identical node/repo context
+    cache_key = _suggestion_cache_key(node, digest, criteria)
+    raw_suggestions = _get_cached_suggestions(cache_key)
+    if raw_suggestions is None:
+        raw_suggestions = await _call_llm_for_suggestions(
+            node=node, digest=digest, criteria=criteria or None, api_key=api_key
+        )
+        if raw_suggestions:
+            _set_cached_suggestions(cache_key, node_id, raw_suggestions)
 
     if not raw_suggestions:
         return []
@@ -4,14 +4,30 @@ import os
 import tempfile
 import shutil
 from pathlib import Path
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock
 
 import pytest
+from pydantic import BaseModel
 
 
-@pytest.fixture
-def sample_repo(tmp_path: Path) -> Path:
-    """Create a minimal fake TypeScript/Node repo on disk for testing."""
+class SampleModel(BaseModel):
+    name: str
+    value: int
+
+
+class SampleItem(BaseModel):
+    title: str
+    score: float
+
+
+@pytest.fixture(scope="session")
+def sample_repo(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Create a minimal fake TypeScript/Node repo on disk for testing.
+
+    Built once per session; tests must treat it as read-only. Use
+    sample_repo_copy for code paths that write to or delete the repo.
+    """
+    tmp_path = tmp_path_factory.mktemp("sample_repo")
     # package.json
     (tmp_path / "package.json").write_text(
         '{"name":"test-app","scripts":{"dev":"next dev","build":"next build","test":"jest","lint":"eslint ."},"dependencies":{"next":"14.0.0","react":"18.2.0"},"devDependencies":{"typescript":"5.3.0","jest":"29.0.0"}}'
@@ -63,7 +79,9 @@ def sample_repo(tmp_path: Path) -> Path:
     # node_modules (should be skipped)
     nm = tmp_path / "node_modules"
     nm.mkdir()
-    (nm / "fake-package.js").write_text("// 10000 lines" * 1000)
+    # Short lines keep the write small while still outweighing the real
+    # sources if the LOC counter ever stops skipping node_modules
+    (nm / "fake-package.js").write_text("skipped\n" * 1000)
 
     # .git (should be skipped)
     git = tmp_path / ".git"
@@ -73,24 +91,36 @@ def sample_repo(tmp_path: Path) -> Path:
     return tmp_path
 
 
+@pytest.fixture(scope="session")
+def large_risk_repo(tmp_path_factory: pytest.TempPathFactory) -> Path:
+    """Create tiny/large/huge source files once per session for risk badge tests.
+
+    risk_service only stat()s anchor files, so the large ones are sparse.
+    """
+    path = tmp_path_factory.mktemp("risk")
+    (path / "tiny.ts").write_text("x")
+    for name, size in (("large.ts", 200_000), ("huge.ts", 2_600_000)):
+        with open(path / name, "wb") as f:
+            f.truncate(size)
+    return path
+
+
 @pytest.fixture
-def mock_supabase():
-    """Return a mocked Supabase client with chainable query methods."""
-    mock = MagicMock()
-
-    # Make table().select/insert/update/eq/order/limit/in_/execute chainable
-    table_mock = MagicMock()
-    mock.table.return_value = table_mock
-    table_mock.select.return_value = table_mock
-    table_mock.insert.return_value = table_mock
-    table_mock.update.return_value = table_mock
-    table_mock.eq.return_value = table_mock
-    table_mock.order.return_value = table_mock
-    table_mock.limit.return_value = table_mock
-    table_mock.in_.return_value = table_mock
-    table_mock.execute.return_value = MagicMock(data=[])
+def sample_repo_copy(sample_repo: Path, tmp_path: Path) -> Path:
+    """Return a private, writable copy of the session-wide sample_repo."""
+    return Path(shutil.copytree(sample_repo, tmp_path / "repo"))
 
-    return mock
+
+@pytest.fixture
+def sample_model() -> type[SampleModel]:
+    """Return a small pydantic model for structured LLM output tests."""
+    return SampleModel
+
+
+@pytest.fixture
+def sample_item() -> type[SampleItem]:
+    """Return a small pydantic list-item model for structured LLM output tests."""
+    return SampleItem
 
 
 @pytest.fixture
@@ -98,3 +128,15 @@ def mock_openai():
     """Return a mocked AsyncOpenAI client."""
     mock = AsyncMock()
     return mock
+
+
+@pytest.fixture
+def mock_llm_client(monkeypatch):
+    """Install an AsyncMock OpenAI client as the result of llm_service._make_client.
+
+    Tests set return_value/side_effect on chat.completions.create.
+    """
+    client = AsyncMock()
+    client.chat.completions.create = AsyncMock()
+    monkeypatch.setattr("app.services.llm_service._make_client", lambda *a, **kw: client)
+    return client
@@ -0,0 +1,112 @@
+"""Plain test helpers shared across test modules (not fixtures)."""
+
+from collections import defaultdict
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+
+def make_completion(content: str) -> MagicMock:
+    """Build a fake OpenAI chat completion response."""
+    choice = MagicMock()
+    choice.message.content = content
+    resp = MagicMock()
+    resp.choices = [choice]
+    return resp
+
+
+def async_return(value):
+    """Return a plain coroutine function that always resolves to ``value``.
+
+    Cheaper than ``AsyncMock`` for hot stubs; ``call_count`` is tracked so
+    tests can still assert how often it was awaited.
+    """
+    async def _f(*args, **kwargs):
+        _f.call_count += 1
+        return value
+
+    _f.call_count = 0
+    return _f
+
+
+def async_side_effect(values):
+    """Return a plain coroutine function that resolves to each of ``values`` in turn."""
+    it = iter(values)
+
+    async def _f(*args, **kwargs):
+        _f.call_count += 1
+        return next(it)
+
+    _f.call_count = 0
+    return _f
+
+
+class FakeTable:
+    """Minimal stand-in for a Supabase table query builder.
+
+    Query methods return ``self`` so calls chain; ``execute()`` returns
+    ``data``. Inserted and updated payloads are recorded for assertions.
+    """
+
+    def __init__(self, data: list):
+        self.data = data
+        self.inserted: list = []
+        self.updated: list = []
+
+    def reset(self) -> None:
+        """Forget recorded writes so a cached table can be reused."""
+        self.inserted.clear()
+        self.updated.clear()
+
+    def select(self, *args, **kwargs) -> "FakeTable":
+        return self
+
+    def insert(self, rows, *args, **kwargs) -> "FakeTable":
+        self.inserted.append(rows)
+        return self
+
+    def update(self, values, *args, **kwargs) -> "FakeTable":
+        self.updated.append(values)
+        return self
+
+    def delete(self, *args, **kwargs) -> "FakeTable":
+        return self
+
+    def eq(self, *args, **kwargs) -> "FakeTable":
+        return self
+
+    def in_(self, *args, **kwargs) -> "FakeTable":
+        return self
+
+    def order(self, *args, **kwargs) -> "FakeTable":
+        return self
+
+    def limit(self, *args, **kwargs) -> "FakeTable":
+        return self
+
+    def execute(self) -> SimpleNamespace:
+        return SimpleNamespace(data=self.data)
+
+
+def build_supabase_mock(
+    table_data: dict[str, list | FakeTable] | None = None, rpc_data=None
+) -> MagicMock:
+    """Build a Supabase mock from ``{table_name: data}``.
+
+    Each named table is a FakeTable built once (or the FakeTable passed in)
+    and returned on every ``.table(name)`` call; other tables return no
+    rows. The tables are exposed as ``mock.tables`` so tests can inspect or
+    reset recorded writes. ``rpc_data`` is what any ``.rpc(...).execute()``
+    returns.
+    """
+    tables = defaultdict(
+        lambda: FakeTable([]),
+        {
+            name: data if isinstance(data, FakeTable) else FakeTable(data)
+            for name, data in (table_data or {}).items()
+        },
+    )
+    mock = MagicMock()
+    mock.table.side_effect = tables.__getitem__
+    mock.tables = tables
+    mock.rpc.return_value.execute.return_value = SimpleNamespace(data=rpc_data)
+    return mock
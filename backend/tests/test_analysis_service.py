@@ -2,15 +2,14 @@
 
 import json
 from pathlib import Path
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, patch
 
-import pytest
+from tests.helpers import build_supabase_mock
 
 
 class TestGenerateRepoDigest:
     """Test generate_repo_digest produces a correct structured digest."""
 
-    @pytest.mark.asyncio
     async def test_returns_file_tree(self, sample_repo: Path):
         from app.services.analysis_service import generate_repo_digest
 
@@ -20,7 +19,6 @@ class TestGenerateRepoDigest:
         assert isinstance(digest["file_tree"], list)
         assert len(digest["file_tree"]) > 0
 
-    @pytest.mark.asyncio
     async def test_file_tree_excludes_vendor_dirs(self, sample_repo: Path):
         from app.services.analysis_service import generate_repo_digest
 
@@ -31,7 +29,6 @@ class TestGenerateRepoDigest:
             assert "node_modules" not in p
             assert ".git" not in p
 
-    @pytest.mark.asyncio
     async def test_detects_framework(self, sample_repo: Path):
         from app.services.analysis_service import generate_repo_digest
 
@@ -41,7 +38,6 @@ class TestGenerateRepoDigest:
         # sample_repo has next in dependencies
         assert digest["framework"] == "next"
 
-    @pytest.mark.asyncio
     async def test_collects_dependencies(self, sample_repo: Path):
         from app.services.analysis_service import generate_repo_digest
 
@@ -52,7 +48,6 @@ class TestGenerateRepoDigest:
         assert "next" in deps
         assert "react" in deps
 
-    @pytest.mark.asyncio
     async def test_collects_scripts(self, sample_repo: Path):
         from app.services.analysis_service import generate_repo_digest
 
@@ -63,7 +58,6 @@ class TestGenerateRepoDigest:
         assert "dev" in scripts
         assert "test" in scripts
 
-    @pytest.mark.asyncio
     async def test_identifies_key_files(self, sample_repo: Path):
         from app.services.analysis_service import generate_repo_digest
 
@@ -76,7 +70,6 @@ class TestGenerateRepoDigest:
         assert "package.json" in key_file_names
         assert "README.md" in key_file_names
 
-    @pytest.mark.asyncio
     async def test_empty_repo(self, tmp_path: Path):
         from app.services.analysis_service import generate_repo_digest
 
@@ -91,7 +84,6 @@ class TestGenerateRepoDigest:
 class TestSummarizeFiles:
     """Test summarize_files calls LLM and returns structured summaries."""
 
-    @pytest.mark.asyncio
     async def test_returns_summaries_for_key_files(self, sample_repo: Path):
         from app.services.analysis_service import summarize_files
 
@@ -129,7 +121,6 @@ class TestSummarizeFiles:
         assert summaries[0]["file_path"] == "src/pages/index.tsx"
         assert "summary" in summaries[0]
 
-    @pytest.mark.asyncio
     async def test_handles_no_key_files(self, tmp_path: Path):
         from app.services.analysis_service import summarize_files
 
@@ -148,8 +139,7 @@ class TestSummarizeFiles:
 class TestInferFeatures:
     """Test infer_features calls LLM and stores nodes/edges in Supabase."""
 
-    @pytest.mark.asyncio
-    async def test_stores_nodes_and_edges(self, mock_supabase):
+    async def test_stores_nodes_and_edges(self):
         from app.services.analysis_service import infer_features
 
         digest = {
@@ -180,11 +170,12 @@ class TestInferFeatures:
             },
         ]
 
-        # Mock the insert to return data with ids
+        # Inserts into feature_nodes return data with ids
         insert_results = [
             {"id": "node-1", "name": "Authentication"},
             {"id": "node-2", "name": "Dashboard"},
         ]
+        mock_supabase = build_supabase_mock({"feature_nodes": insert_results})
 
         with (
             patch("app.services.analysis_service._call_llm_for_features") as mock_llm,
@@ -193,18 +184,12 @@ class TestInferFeatures:
             mock_llm.return_value = fake_nodes
             mock_db_fn.return_value = mock_supabase
 
-            # Set up insert mock to return node ids
-            mock_supabase.table.return_value.insert.return_value.execute.return_value = MagicMock(
-                data=insert_results
-            )
-
             result = await infer_features("run-123", digest, summaries)
 
         # Should have called insert for nodes
         assert mock_supabase.table.called
 
-    @pytest.mark.asyncio
-    async def test_handles_empty_features(self, mock_supabase):
+    async def test_handles_empty_features(self):
         from app.services.analysis_service import infer_features
 
         digest = {
@@ -220,7 +205,7 @@ class TestInferFeatures:
             patch("app.services.analysis_service.get_supabase") as mock_db_fn,
         ):
             mock_llm.return_value = []
-            mock_db_fn.return_value = mock_supabase
+            mock_db_fn.return_value = build_supabase_mock()
 
             result = await infer_features("run-123", digest, [])
 
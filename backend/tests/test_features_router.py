@@ -0,0 +1,83 @@
+"""Tests for the features router — suggestion endpoint responses."""
+
+import orjson
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers import features
+from app.services import suggestion_service
+from tests.helpers import async_return, build_supabase_mock
+
+
+@pytest.fixture
+def client() -> TestClient:
+    app = FastAPI()
+    app.include_router(features.router)
+    return TestClient(app)
+
+
+def _suggestion_row(i: int) -> dict:
+    return {
+        "id": f"sugg-{i}",
+        "feature_node_id": "node-1",
+        "name": f"Suggestion {i}",
+        "rationale": "Fits the feature",
+        "complexity": "low",
+        "impacted_files": ["src/api/auth.ts"],
+        "test_cases": ["Should work"],
+        "implementation_sketch": None,
+        "created_at": "2026-01-01T00:00:00+00:00",
+    }
+
+
+class TestGetSuggestions:
+    """Test GET /api/features/{node_id}/suggestions."""
+
+    def test_returns_existing_rows_as_json(self, client, monkeypatch):
+        rows = [_suggestion_row(0), _suggestion_row(1)]
+        monkeypatch.setattr(features, "get_supabase", lambda: build_supabase_mock({"feature_suggestions": rows}))
+
+        resp = client.get("/api/features/node-1/suggestions")
+
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "application/json"
+        assert orjson.loads(resp.content) == rows
+
+    def test_returns_generated_suggestions(self, client, monkeypatch):
+        rows = [_suggestion_row(0)]
+        generate = async_return(rows)
+        mock_supabase = build_supabase_mock()
+        monkeypatch.setattr(features, "get_supabase", lambda: mock_supabase)
+        monkeypatch.setattr(suggestion_service, "generate_suggestions", generate)
+
+        resp = client.get("/api/features/node-1/suggestions")
+
+        assert resp.status_code == 200
+        assert orjson.loads(resp.content) == rows
+        assert generate.call_count == 1
+        # The route only checks for stored rows; the service resolves the node
+        mock_supabase.table.assert_called_once_with("feature_suggestions")
+
+    def test_missing_node_returns_404(self, client, monkeypatch):
+        mock_supabase = build_supabase_mock()
+        monkeypatch.setattr(features, "get_supabase", lambda: mock_supabase)
+        monkeypatch.setattr(suggestion_service, "get_supabase", lambda: mock_supabase)
+
+        resp = client.get("/api/features/missing/suggestions")
+
+        assert resp.status_code == 404
+        assert resp.json()["detail"] == "Feature node missing not found"
+
+    def test_missing_analysis_run_returns_404(self, client, monkeypatch):
+        mock_supabase = build_supabase_mock(rpc_data={
+            "node": {"id": "node-1", "analysis_run_id": "run-gone"},
+            "run": None,
+        })
+        monkeypatch.setattr(features, "get_supabase", lambda: mock_supabase)
+        monkeypatch.setattr(suggestion_service, "get_supabase", lambda: mock_supabase)
+
+        resp = client.get("/api/features/node-1/suggestions")
+
+        assert resp.status_code == 404
+        assert resp.json()["detail"] == "Analysis run run-gone not found"
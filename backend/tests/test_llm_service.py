@@ -1,186 +1,110 @@
 """Tests for llm_service — structured output, retries, validation."""
 
 import json
-from unittest.mock import AsyncMock, MagicMock, patch
+from contextlib import nullcontext
+from unittest.mock import MagicMock
 
 import pytest
-from pydantic import BaseModel
 
+from app.services.llm_service import (
+    call_llm_structured,
+    call_llm_structured_list,
+    list_adapter,
+)
+from tests.helpers import make_completion
 
-class SampleModel(BaseModel):
-    name: str
-    value: int
+# No module-level mutable state: each test gets its own client via
+# mock_llm_client, so these tests are safe to spread across xdist workers.
 
-
-class SampleItem(BaseModel):
-    title: str
-    score: float
-
-
-def _make_completion(content: str) -> MagicMock:
-    """Build a fake OpenAI chat completion response."""
-    choice = MagicMock()
-    choice.message.content = content
-    resp = MagicMock()
-    resp.choices = [choice]
-    return resp
+_GOOD_CONTENT = json.dumps({"name": "ok", "value": 1})
 
 
 class TestCallLlmStructured:
     """Test call_llm_structured with mocked OpenAI."""
 
-    @pytest.mark.asyncio
-    async def test_valid_json_returns_model(self):
-        from app.services.llm_service import call_llm_structured
-
-        fake_resp = _make_completion(json.dumps({"name": "test", "value": 42}))
-
-        with patch("app.services.llm_service._make_client") as mock_make:
-            client = AsyncMock()
-            client.chat.completions.create = AsyncMock(return_value=fake_resp)
-            mock_make.return_value = client
-
-            result = await call_llm_structured("sys", "usr", SampleModel)
-
-        assert isinstance(result, SampleModel)
-        assert result.name == "test"
-        assert result.value == 42
-
-    @pytest.mark.asyncio
-    async def test_retries_on_invalid_json(self):
-        from app.services.llm_service import call_llm_structured
-
-        bad_resp = _make_completion("not json at all")
-        good_resp = _make_completion(json.dumps({"name": "ok", "value": 1}))
-
-        with patch("app.services.llm_service._make_client") as mock_make:
-            client = AsyncMock()
-            client.chat.completions.create = AsyncMock(
-                side_effect=[bad_resp, good_resp]
-            )
-            mock_make.return_value = client
-
-            result = await call_llm_structured("sys", "usr", SampleModel)
-
-        assert result.name == "ok"
-        assert client.chat.completions.create.call_count == 2
-
-    @pytest.mark.asyncio
-    async def test_retries_on_schema_mismatch(self):
-        from app.services.llm_service import call_llm_structured
-
-        # Valid JSON but wrong schema (missing required field)
-        bad_resp = _make_completion(json.dumps({"name": "test"}))
-        good_resp = _make_completion(json.dumps({"name": "ok", "value": 5}))
-
-        with patch("app.services.llm_service._make_client") as mock_make:
-            client = AsyncMock()
-            client.chat.completions.create = AsyncMock(
-                side_effect=[bad_resp, good_resp]
-            )
-            mock_make.return_value = client
-
-            result = await call_llm_structured("sys", "usr", SampleModel)
-
-        assert result.value == 5
-
-    @pytest.mark.asyncio
-    async def test_raises_after_max_retries(self):
-        from app.services.llm_service import call_llm_structured
-
-        bad_resp = _make_completion("garbage")
-
-        with patch("app.services.llm_service._make_client") as mock_make:
-            client = AsyncMock()
-            client.chat.completions.create = AsyncMock(return_value=bad_resp)
-            mock_make.return_value = client
-
-            with pytest.raises(ValueError, match="invalid output"):
-                await call_llm_structured("sys", "usr", SampleModel, max_retries=2)
-
-        # 1 initial + 2 retries = 3 calls
-        assert client.chat.completions.create.call_count == 3
-
-    @pytest.mark.asyncio
-    async def test_passes_api_key_to_client(self):
-        from app.services.llm_service import call_llm_structured
-
-        fake_resp = _make_completion(json.dumps({"name": "test", "value": 1}))
-
-        with patch("app.services.llm_service._make_client") as mock_make:
-            client = AsyncMock()
-            client.chat.completions.create = AsyncMock(return_value=fake_resp)
-            mock_make.return_value = client
-
-            await call_llm_structured(
-                "sys", "usr", SampleModel, api_key="sk-user-key"
-            )
+    @pytest.mark.parametrize(
+        "contents,raises,calls",
+        [
+            pytest.param([_GOOD_CONTENT], None, 1, id="valid"),
+            pytest.param(["not json at all", _GOOD_CONTENT], None, 2, id="retries-invalid-json"),
+            # Valid JSON but wrong schema (missing required field)
+            pytest.param([json.dumps({"name": "test"}), _GOOD_CONTENT], None, 2, id="retries-schema-mismatch"),
+            # 1 initial + 2 retries = 3 calls
+            pytest.param(["garbage"] * 3, ValueError, 3, id="raises-after-max-retries"),
+        ],
+    )
+    async def test_retry_matrix(self, mock_llm_client, sample_model, contents, raises, calls):
+        mock_llm_client.chat.completions.create.side_effect = [
+            make_completion(c) for c in contents
+        ]
+
+        with pytest.raises(raises, match="invalid output") if raises else nullcontext():
+            result = await call_llm_structured("sys", "usr", sample_model, max_retries=2)
+
+        if raises is None:
+            assert result == sample_model(name="ok", value=1)
+        assert mock_llm_client.chat.completions.create.call_count == calls
+
+    async def test_passes_api_key_to_client(self, mock_llm_client, monkeypatch, sample_model):
+        fake_resp = make_completion(json.dumps({"name": "test", "value": 1}))
+        make_client = MagicMock(return_value=mock_llm_client)
+        monkeypatch.setattr("app.services.llm_service._make_client", make_client)
+
+        mock_llm_client.chat.completions.create.return_value = fake_resp
+
+        await call_llm_structured(
+            "sys", "usr", sample_model, api_key="sk-user-key"
+        )
 
-        mock_make.assert_called_once_with("sk-user-key")
+        make_client.assert_called_once_with("sk-user-key")
 
 
 class TestCallLlmStructuredList:
     """Test call_llm_structured_list with mocked OpenAI."""
 
-    @pytest.mark.asyncio
-    async def test_valid_list_response(self):
-        from app.services.llm_service import call_llm_structured_list
-
+    async def test_valid_list_response(self, mock_llm_client, sample_item):
         payload = json.dumps(
             {"items": [{"title": "A", "score": 1.0}, {"title": "B", "score": 2.0}]}
         )
-        resp = _make_completion(payload)
+        resp = make_completion(payload)
 
-        with patch("app.services.llm_service._make_client") as mock_make:
-            client = AsyncMock()
-            client.chat.completions.create = AsyncMock(return_value=resp)
-            mock_make.return_value = client
+        mock_llm_client.chat.completions.create.return_value = resp
 
-            result = await call_llm_structured_list(
-                "sys", "usr", SampleItem, list_key="items"
-            )
+        result = await call_llm_structured_list(
+            "sys", "usr", sample_item, list_key="items"
+        )
 
         assert len(result) == 2
         assert result[0].title == "A"
         assert result[1].score == 2.0
 
-    @pytest.mark.asyncio
-    async def test_retries_on_non_list_value(self):
-        from app.services.llm_service import call_llm_structured_list
-
-        bad_resp = _make_completion(json.dumps({"items": "not a list"}))
-        good_resp = _make_completion(
+    async def test_retries_on_non_list_value(self, mock_llm_client, sample_item):
+        bad_resp = make_completion(json.dumps({"items": "not a list"}))
+        good_resp = make_completion(
             json.dumps({"items": [{"title": "X", "score": 3.0}]})
         )
 
-        with patch("app.services.llm_service._make_client") as mock_make:
-            client = AsyncMock()
-            client.chat.completions.create = AsyncMock(
-                side_effect=[bad_resp, good_resp]
-            )
-            mock_make.return_value = client
+        mock_llm_client.chat.completions.create.side_effect = [bad_resp, good_resp]
 
-            result = await call_llm_structured_list(
-                "sys", "usr", SampleItem, list_key="items"
-            )
+        result = await call_llm_structured_list(
+            "sys", "usr", sample_item, list_key="items"
+        )
 
         assert len(result) == 1
         assert result[0].title == "X"
 
-    @pytest.mark.asyncio
-    async def test_raises_after_max_retries_list(self):
-        from app.services.llm_service import call_llm_structured_list
+    async def test_raises_after_max_retries_list(self, mock_llm_client, sample_item):
+        bad_resp = make_completion("not json")
 
-        bad_resp = _make_completion("not json")
+        mock_llm_client.chat.completions.create.return_value = bad_resp
 
-        with patch("app.services.llm_service._make_client") as mock_make:
-            client = AsyncMock()
-            client.chat.completions.create = AsyncMock(return_value=bad_resp)
-            mock_make.return_value = client
+        with pytest.raises(ValueError, match="invalid list output"):
+            await call_llm_structured_list(
+                "sys", "usr", sample_item, max_retries=1
+            )
 
-            with pytest.raises(ValueError, match="invalid list output"):
-                await call_llm_structured_list(
-                    "sys", "usr", SampleItem, max_retries=1
-                )
+        assert mock_llm_client.chat.completions.create.call_count == 2
 
-        assert client.chat.completions.create.call_count == 2
+    def test_list_adapter_is_cached_per_model(self, sample_item, sample_model):
+        assert list_adapter(sample_item) is list_adapter(sample_item)
+        assert list_adapter(sample_item) is not list_adapter(sample_model)
@@ -1,17 +1,34 @@
 """Tests for suggestion_service — feature expansion suggestions via LLM."""
 
 import json
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import patch
 
 import pytest
 from pydantic import BaseModel
 
+from tests.helpers import build_supabase_mock, make_completion
+
+
+@pytest.fixture(autouse=True)
+def _reset_suggestion_state():
+    """Clear suggestion_service's module-level cache and criteria store around each test.
+
+    Both are process-wide dicts, so entries written by one test would
+    otherwise be visible to every later test in the same process.
+    """
+    from app.services import suggestion_service
+
+    suggestion_service._suggestion_cache.clear()
+    suggestion_service._criteria_store.clear()
+    yield
+    suggestion_service._suggestion_cache.clear()
+    suggestion_service._criteria_store.clear()
+
 
 class TestGenerateSuggestions:
     """Test generate_suggestions fetches context, calls LLM, stores results."""
 
-    @pytest.mark.asyncio
-    async def test_returns_3_to_8_suggestions(self, mock_supabase):
+    async def test_returns_3_to_8_suggestions(self):
         from app.services.suggestion_service import generate_suggestions
 
         node_id = "node-123"
@@ -64,31 +81,16 @@ class TestGenerateSuggestions:
             },
         ]
 
-        # DB returns: node lookup, run lookup, then insert suggestions
+        # DB returns: node + run via one RPC, then insert suggestions
         insert_data = [
-            {**s, "id": f"sugg-{i}", "feature_node_id": node_id}
+            s | {"id": f"sugg-{i}", "feature_node_id": node_id}
             for i, s in enumerate(fake_suggestions)
         ]
 
-        def table_side_effect(name):
-            mock_table = MagicMock()
-            mock_table.select.return_value = mock_table
-            mock_table.insert.return_value = mock_table
-            mock_table.eq.return_value = mock_table
-            mock_table.order.return_value = mock_table
-            mock_table.limit.return_value = mock_table
-
-            if name == "feature_nodes":
-                mock_table.execute.return_value = MagicMock(data=[node_row])
-            elif name == "analysis_runs":
-                mock_table.execute.return_value = MagicMock(data=[run_row])
-            elif name == "feature_suggestions":
-                mock_table.execute.return_value = MagicMock(data=insert_data)
-            else:
-                mock_table.execute.return_value = MagicMock(data=[])
-            return mock_table
-
-        mock_supabase.table.side_effect = table_side_effect
+        mock_supabase = build_supabase_mock(
+            {"feature_suggestions": insert_data},
+            rpc_data={"node": node_row, "run": run_row},
+        )
 
         with (
             patch("app.services.suggestion_service.get_supabase", return_value=mock_supabase),
@@ -102,8 +104,7 @@ class TestGenerateSuggestions:
         assert result[1]["complexity"] == "low"
         assert result[2]["name"] == "Two-Factor Auth"
 
-    @pytest.mark.asyncio
-    async def test_includes_required_fields_in_each_suggestion(self, mock_supabase):
+    async def test_includes_required_fields_in_each_suggestion(self):
         from app.services.suggestion_service import generate_suggestions
 
         node_id = "node-456"
@@ -140,29 +141,14 @@ class TestGenerateSuggestions:
         ]
 
         insert_data = [
-            {**s, "id": "sugg-0", "feature_node_id": node_id}
+            s | {"id": "sugg-0", "feature_node_id": node_id}
             for s in fake_suggestions
         ]
 
-        def table_side_effect(name):
-            mock_table = MagicMock()
-            mock_table.select.return_value = mock_table
-            mock_table.insert.return_value = mock_table
-            mock_table.eq.return_value = mock_table
-            mock_table.order.return_value = mock_table
-            mock_table.limit.return_value = mock_table
-
-            if name == "feature_nodes":
-                mock_table.execute.return_value = MagicMock(data=[node_row])
-            elif name == "analysis_runs":
-                mock_table.execute.return_value = MagicMock(data=[run_row])
-            elif name == "feature_suggestions":
-                mock_table.execute.return_value = MagicMock(data=insert_data)
-            else:
-                mock_table.execute.return_value = MagicMock(data=[])
-            return mock_table
-
-        mock_supabase.table.side_effect = table_side_effect
+        mock_supabase = build_supabase_mock(
+            {"feature_suggestions": insert_data},
+            rpc_data={"node": node_row, "run": run_row},
+        )
 
         with (
             patch("app.services.suggestion_service.get_supabase", return_value=mock_supabase),
@@ -179,25 +165,16 @@ class TestGenerateSuggestions:
             assert "test_cases" in s
             assert "implementation_sketch" in s
 
-    @pytest.mark.asyncio
-    async def test_node_not_found_raises(self, mock_supabase):
+    async def test_node_not_found_raises(self):
         from app.services.suggestion_service import generate_suggestions
 
-        def table_side_effect(name):
-            mock_table = MagicMock()
-            mock_table.select.return_value = mock_table
-            mock_table.eq.return_value = mock_table
-            mock_table.execute.return_value = MagicMock(data=[])
-            return mock_table
-
-        mock_supabase.table.side_effect = table_side_effect
+        mock_supabase = build_supabase_mock()
 
         with patch("app.services.suggestion_service.get_supabase", return_value=mock_supabase):
             with pytest.raises(ValueError, match="Feature node .* not found"):
                 await generate_suggestions("nonexistent-node")
 
-    @pytest.mark.asyncio
-    async def test_passes_api_key_to_llm(self, mock_supabase):
+    async def test_passes_api_key_to_llm(self):
         from app.services.suggestion_service import generate_suggestions
 
         node_row = {
@@ -214,25 +191,10 @@ class TestGenerateSuggestions:
             "digest_json": {"file_tree": [], "framework": None, "dependencies": {}, "scripts": {}, "key_files": []},
         }
 
-        def table_side_effect(name):
-            mock_table = MagicMock()
-            mock_table.select.return_value = mock_table
-            mock_table.insert.return_value = mock_table
-            mock_table.eq.return_value = mock_table
-            mock_table.order.return_value = mock_table
-            mock_table.limit.return_value = mock_table
-
-            if name == "feature_nodes":
-                mock_table.execute.return_value = MagicMock(data=[node_row])
-            elif name == "analysis_runs":
-                mock_table.execute.return_value = MagicMock(data=[run_row])
-            elif name == "feature_suggestions":
-                mock_table.execute.return_value = MagicMock(data=[])
-            else:
-                mock_table.execute.return_value = MagicMock(data=[])
-            return mock_table
-
-        mock_supabase.table.side_effect = table_side_effect
+        mock_supabase = build_supabase_mock(
+            {"feature_suggestions": []},
+            rpc_data={"node": node_row, "run": run_row},
+        )
 
         with (
             patch("app.services.suggestion_service.get_supabase", return_value=mock_supabase),
@@ -244,3 +206,227 @@ class TestGenerateSuggestions:
         mock_llm.assert_called_once()
         call_kwargs = mock_llm.call_args
         assert call_kwargs[1].get("api_key") == "sk-user-key" or call_kwargs[0][-1] == "sk-user-key"
+
+    async def test_cache_hit_skips_llm(self):
+        from app.services.suggestion_service import generate_suggestions
+
+        node_row = {
+            "id": "node-cache",
+            "analysis_run_id": "run-4",
+            "name": "Billing",
+            "description": "Stripe checkout",
+            "anchor_files": ["src/api/billing.ts"],
+            "parent_feature_id": None,
+        }
+        run_row = {
+            "id": "run-4",
+            "repo_id": "repo-4",
+            "digest_json": {"file_tree": ["src/api/billing.ts"], "framework": "next", "dependencies": {}},
+        }
+        fake_suggestions = [
+            {
+                "name": "Invoices",
+                "rationale": "Customers need receipts",
+                "complexity": "low",
+                "impacted_files": ["src/api/billing.ts"],
+                "test_cases": ["Should render invoice"],
+                "implementation_sketch": "Add invoice endpoint",
+            },
+        ]
+
+        mock_supabase = build_supabase_mock(
+            {"feature_suggestions": fake_suggestions},
+            rpc_data={"node": node_row, "run": run_row},
+        )
+
+        with (
+            patch("app.services.suggestion_service.get_supabase", return_value=mock_supabase),
+            patch("app.services.suggestion_service._call_llm_for_suggestions") as mock_llm,
+        ):
+            mock_llm.return_value = fake_suggestions
+            first = await generate_suggestions("node-cache", api_key="sk-a")
+            second = await generate_suggestions("node-cache", api_key="sk-b")
+
+        assert mock_llm.call_count == 1
+        assert first == second
+
+    async def test_invalidated_node_regenerates(self):
+        from app.services.suggestion_service import generate_suggestions, invalidate_suggestion_cache
+
+        node_row = {"id": "node-inv", "analysis_run_id": "run-5", "name": "Auth", "description": "Login"}
+        run_row = {"id": "run-5", "repo_id": "repo-5", "digest_json": {}}
+        fake_suggestions = [{"name": "SSO", "rationale": "r", "complexity": "low"}]
+        mock_supabase = build_supabase_mock(
+            {"feature_suggestions": fake_suggestions},
+            rpc_data={"node": node_row, "run": run_row},
+        )
+
+        with (
+            patch("app.services.suggestion_service.get_supabase", return_value=mock_supabase),
+            patch("app.services.suggestion_service._call_llm_for_suggestions") as mock_llm,
+        ):
+            mock_llm.return_value = fake_suggestions
+            await generate_suggestions("node-inv")
+            # Routes call this after deleting stored rows (node edit, criteria save)
+            invalidate_suggestion_cache(["node-inv"])
+            await generate_suggestions("node-inv")
+
+        assert mock_llm.call_count == 2
+
+    async def test_uses_single_rpc_for_context_fetch(self):
+        from app.services.suggestion_service import generate_suggestions
+
+        node_row = {
+            "id": "node-rpc",
+            "analysis_run_id": "run-5",
+            "name": "Profile",
+            "description": "User profile page",
+            "anchor_files": [],
+            "parent_feature_id": None,
+        }
+        run_row = {"id": "run-5", "repo_id": "repo-5", "digest_json": {"file_tree": []}}
+        fake_suggestions = [
+            {"name": "Avatar Upload", "rationale": "Personalize profiles", "complexity": "low"},
+        ]
+
+        mock_supabase = build_supabase_mock(
+            {"feature_suggestions": fake_suggestions},
+            rpc_data={"node": node_row, "run": run_row},
+        )
+
+        with (
+            patch("app.services.suggestion_service.get_supabase", return_value=mock_supabase),
+            patch("app.services.suggestion_service._call_llm_for_suggestions") as mock_llm,
+        ):
+            mock_llm.return_value = fake_suggestions
+            await generate_suggestions("node-rpc")
+
+        mock_supabase.rpc.assert_called_once_with("get_node_with_run", {"node_id": "node-rpc"})
+        # Only the feature_suggestions insert goes through .table()
+        assert mock_supabase.table.call_count == 1
+        mock_supabase.table.assert_called_once_with("feature_suggestions")
+
+
+class TestCallLlmForSuggestions:
+    """Test _call_llm_for_suggestions parses and validates LLM output."""
+
+    async def test_rejects_malformed_llm_json(self, mock_llm_client):
+        from app.services.suggestion_service import _call_llm_for_suggestions
+
+        # Second item is missing required fields; every attempt returns it
+        mock_llm_client.chat.completions.create.return_value = make_completion(json.dumps(
+            {"suggestions": [{"name": "A", "rationale": "r", "complexity": "low"}, {"name": "B"}]}
+        ))
+
+        node = {"name": "Auth", "description": "Login", "anchor_files": []}
+        with pytest.raises(ValueError, match="invalid list output"):
+            await _call_llm_for_suggestions(node, digest={})
+
+        assert mock_llm_client.chat.completions.create.call_count == 3
+
+    async def test_returns_plain_dicts_with_defaults(self, mock_llm_client):
+        from app.services.suggestion_service import _call_llm_for_suggestions
+
+        mock_llm_client.chat.completions.create.return_value = make_completion(json.dumps(
+            {"suggestions": [{"name": "A", "rationale": "r", "complexity": "low"}]}
+        ))
+
+        node = {"name": "Auth", "description": "Login", "anchor_files": []}
+        result = await _call_llm_for_suggestions(node, digest={})
+
+        assert result == [
+            {
+                "name": "A",
+                "rationale": "r",
+                "complexity": "low",
+                "impacted_files": [],
+                "test_cases": [],
+                "implementation_sketch": None,
+            }
+        ]
+
+    async def test_prompt_prefix_is_stable_across_nodes(self, monkeypatch):
+        from app.services import suggestion_service
+        from app.services.suggestion_service import _call_llm_for_suggestions
+
+        prompts = []
+
+        async def capture(system_prompt, user_prompt, **kwargs):
+            prompts.append((system_prompt, user_prompt))
+            return []
+
+        monkeypatch.setattr(suggestion_service, "call_llm_structured_list", capture)
+
+        digest = {"framework": "next", "dependencies": {"next": "14.0.0"}, "file_tree": ["src/a.ts"]}
+        await _call_llm_for_suggestions({"name": "Auth", "description": "Login"}, digest)
+        await _call_llm_for_suggestions(
+            {"name": "Billing", "description": "Stripe"}, digest, criteria={"budget": "small"}
+        )
+
+        (sys_a, user_a), (sys_b, user_b) = prompts
+        # System prompt is fixed; criteria live in the user message tail
+        assert sys_a == sys_b
+        assert "budget: small" in user_b
+        # Repo context comes first, so both prompts share it as a prefix
+        repo_context = user_a[: user_a.index("Feature:")]
+        assert "File tree:\nsrc/a.ts" in repo_context
+        assert user_b.startswith(repo_context)
+
+    def test_cache_key_ignores_dict_order(self):
+        from app.services.suggestion_service import _suggestion_cache_key
+
+        node = {"name": "Auth", "description": "Login", "anchor_files": ["a.ts"]}
+        digest_a = {"framework": "next", "dependencies": {"next": "14", "react": "18"}}
+        digest_b = {"dependencies": {"react": "18", "next": "14"}, "framework": "next"}
+
+        assert _suggestion_cache_key(node, digest_a, None) == _suggestion_cache_key(node, digest_b, {})
+        assert _suggestion_cache_key(node, digest_a, None) != _suggestion_cache_key(
+            node, digest_a, {"budget": "small"}
+        )
+
+    def test_cache_key_normalizes_node_wording(self):
+        from app.services.suggestion_service import _suggestion_cache_key
+
+        digest = {"framework": "next"}
+        a = {"name": "User Auth", "description": "Login and  sessions", "anchor_files": ["b.ts", "a.ts"]}
+        b = {"name": "  user auth", "description": "login and sessions\n", "anchor_files": ["a.ts", "b.ts"]}
+        c = {"name": "Billing", "description": "Login and sessions", "anchor_files": ["a.ts", "b.ts"]}
+
+        assert _suggestion_cache_key(a, digest, None) == _suggestion_cache_key(b, digest, None)
+        assert _suggestion_cache_key(a, digest, None) != _suggestion_cache_key(c, digest, None)
+
+
+class TestSuggestionCache:
+    """Test the in-memory suggestion cache stays bounded and can be invalidated."""
+
+    def test_set_drops_expired_entries(self, monkeypatch):
+        from app.services import suggestion_service as svc
+
+        monkeypatch.setattr(svc, "SUGGESTION_CACHE_TTL_SECONDS", -1)
+        svc._set_cached_suggestions("stale", "node-1", [{"name": "A"}])
+        monkeypatch.setattr(svc, "SUGGESTION_CACHE_TTL_SECONDS", 1800)
+        svc._set_cached_suggestions("fresh", "node-1", [{"name": "B"}])
+
+        assert list(svc._suggestion_cache) == ["fresh"]
+
+    def test_evicts_least_recently_used_over_cap(self, monkeypatch):
+        from app.services import suggestion_service as svc
+
+        monkeypatch.setattr(svc, "SUGGESTION_CACHE_MAX_ENTRIES", 2)
+        svc._set_cached_suggestions("a", "node-a", [{"name": "A"}])
+        svc._set_cached_suggestions("b", "node-b", [{"name": "B"}])
+        assert svc._get_cached_suggestions("a") == [{"name": "A"}]  # "a" is now most recent
+        svc._set_cached_suggestions("c", "node-c", [{"name": "C"}])
+
+        assert list(svc._suggestion_cache) == ["a", "c"]
+        assert svc._get_cached_suggestions("b") is None
+
+    def test_invalidate_drops_only_given_nodes(self):
+        from app.services import suggestion_service as svc
+
+        svc._set_cached_suggestions("k1", "node-1", [{"name": "A"}])
+        svc._set_cached_suggestions("k2", "node-1", [{"name": "B"}])
+        svc._set_cached_suggestions("k3", "node-2", [{"name": "C"}])
+        svc.invalidate_suggestion_cache(["node-1"])
+
+        assert list(svc._suggestion_cache) == ["k3"]
@@ -0,0 +1,24 @@
+-- Fetch a feature node together with its analysis run in one round trip.
+-- Used by suggestion generation, which needs the node plus the run's repo_id and digest.
+-- Returns null when the node does not exist; "run" is null if the run row is missing.
+
+create or replace function get_node_with_run(node_id uuid)
+returns jsonb
+language sql
+stable
+as $$
+    select jsonb_build_object(
+        'node', to_jsonb(n),
+        'run', case
+            when r.id is null then null
+            else jsonb_build_object(
+                'id', r.id,
+                'repo_id', r.repo_id,
+                'digest_json', r.digest_json
+            )
+        end
+    )
+    from feature_nodes n
+    left join analysis_runs r on r.id = n.analysis_run_id
+    where n.id = get_node_with_run.node_id;
+$$;